@@ -1,145 +1,192 @@
-import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
-from bb84_simulation import BB84Simulator
-import numpy as np
-import traceback
-
-def plot_transmission(df, title):
-    try:
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # Plot Alice's bits and bases
-        ax.scatter(df['step'], [0.8] * len(df), marker='s', c=['red' if b == 1 else 'blue' for b in df['alice_bits']], 
-                  label='Alice Bits', s=100)
-        
-        # Plot Bob's bits and bases
-        ax.scatter(df['step'], [0.2] * len(df), marker='s', c=['red' if b == 1 else 'blue' for b in df['bob_bits']], 
-                  label='Bob Bits', s=100)
-        
-        # Plot bases as symbols
-        for i, (alice_base, bob_base) in enumerate(zip(df['alice_bases'], df['bob_bases'])):
-            if alice_base == '+':
-                ax.plot([i, i], [0.7, 0.9], 'k-', alpha=0.5)
-                ax.plot([i-0.2, i+0.2], [0.8, 0.8], 'k-', alpha=0.5)
-            else:
-                ax.plot([i-0.2, i+0.2], [0.7, 0.9], 'k-', alpha=0.5)
-                ax.plot([i+0.2, i-0.2], [0.7, 0.9], 'k-', alpha=0.5)
-            
-            if bob_base == '+':
-                ax.plot([i, i], [0.1, 0.3], 'k-', alpha=0.5)
-                ax.plot([i-0.2, i+0.2], [0.2, 0.2], 'k-', alpha=0.5)
-            else:
-                ax.plot([i-0.2, i+0.2], [0.1, 0.3], 'k-', alpha=0.5)
-                ax.plot([i+0.2, i-0.2], [0.1, 0.3], 'k-', alpha=0.5)
-        
-        # Highlight matching bases
-        for i, matched in enumerate(df['matched']):
-            if matched:
-                ax.axvspan(i-0.4, i+0.4, color='green', alpha=0.1)
-        
-        ax.set_ylim(0, 1)
-        ax.set_xlim(-1, len(df))
-        ax.set_yticks([0.2, 0.8])
-        ax.set_yticklabels(['Bob', 'Alice'])
-        ax.set_xlabel('Qubit Number')
-        ax.set_title(title)
-        
-        # Add legend
-        from matplotlib.patches import Patch
-        legend_elements = [
-            Patch(facecolor='blue', label='Bit 0'),
-            Patch(facecolor='red', label='Bit 1'),
-            Patch(facecolor='green', alpha=0.1, label='Matching Bases')
-        ]
-        ax.legend(handles=legend_elements, loc='upper right')
-        
-        plt.tight_layout()
-        return fig
-    except Exception as e:
-        st.error(f"Error creating visualization: {str(e)}")
-        return None
-
-def main():
-    st.set_page_config(
-        page_title="BB84 Quantum Key Distribution Simulator",
-        page_icon="🔐",
-        layout="wide"
-    )
-    
-    st.title("BB84 Quantum Key Distribution Protocol Simulator")
-    st.write("""
-    This simulator demonstrates the BB84 quantum key distribution protocol, showing how 
-    quantum properties can be used to generate a secure encryption key between two parties.
-    """)
-    
-    # Add explanation
-    with st.expander("How does BB84 work?"):
-        st.write("""
-        1. **Alice** generates random bits and encodes them in random bases (+ or x)
-        2. **Bob** measures the qubits in random bases
-        3. They compare bases and keep only matching ones (sifting)
-        4. They check for errors to detect eavesdropping
-        5. If secure, they use the remaining bits as a key
-        """)
-    
-    # Simulation parameters
-    col1, col2 = st.columns(2)
-    with col1:
-        num_qubits = st.slider("Number of Qubits", 10, 2000, 1000)
-    with col2:
-        eavesdropping = st.checkbox("Enable Eavesdropping (Eve)")
-    
-    if st.button("Run Simulation", type="primary"):
-        try:
-            with st.spinner("Running simulation..."):
-                # Run simulation
-                simulator = BB84Simulator(num_qubits=num_qubits, eavesdropping=eavesdropping)
-                results = simulator.simulate()
-            
-            # Display results
-            st.header("Simulation Results")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Qubits", results['total_qubits'])
-            with col2:
-                st.metric("Sifted Bits", results['sifted_bits'])
-            with col3:
-                st.metric("Error Rate", f"{results['error_rate']:.2%}")
-            
-            # Display security status
-            if results['secure']:
-                st.success("🔒 Key Exchange Successful - Channel appears secure!")
-            else:
-                st.error("⚠️ Warning: High error rate detected! Possible eavesdropping!")
-            
-            # Show visualization
-            st.header("Protocol Visualization")
-            st.write("This visualization shows the first 20 qubits of the transmission:")
-            df = simulator.get_visualization_data()
-            fig = plot_transmission(df, "BB84 Protocol Transmission Visualization")
-            if fig:
-                st.pyplot(fig)
-            
-            # Display final key if secure
-            if results['secure'] and results['final_key']:
-                st.header("Final Key")
-                key_display = results['final_key'][:64] + "..." if len(results['final_key']) > 64 else results['final_key']
-                st.code(key_display)
-                st.write(f"Final key length: {results['final_key_length']} bits")
-                
-                # Add key statistics
-                st.subheader("Key Statistics")
-                key_bits = [int(b) for b in results['final_key']]
-                zeros = sum(1 for b in key_bits if b == 0)
-                ones = sum(1 for b in key_bits if b == 1)
-                st.write(f"Zeros: {zeros} ({zeros/len(key_bits):.1%})")
-                st.write(f"Ones: {ones} ({ones/len(key_bits):.1%})")
-        
-        except Exception as e:
-            st.error(f"Error during simulation: {str(e)}")
-            st.error("Stack trace:")
-            st.code(traceback.format_exc())
-
-if __name__ == "__main__":
+import streamlit as st
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import Patch, Rectangle
+from bb84_simulation import BB84Simulator
+import numpy as np
+import pandas as pd
+import traceback
+from threading import RLock
+
+# Matplotlib is not thread-safe; serialize figure work across Streamlit sessions
+_plot_lock = RLock()
+
+def _basis_glyph_segments(x, bases, y_center):
+    """Build line segments drawing the '+'/'x' basis glyphs centered on y_center"""
+    x = np.asarray(x, dtype=float)
+    bases = np.asarray(bases)
+    lo, hi, mid = y_center - 0.1, y_center + 0.1, y_center
+    xp = x[bases == '+']
+    xc = x[bases == 'x']
+
+    def seg(x0, y0, x1, y1):
+        return np.stack([np.stack([x0, y0], axis=-1), np.stack([x1, y1], axis=-1)], axis=1)
+
+    full = np.full_like
+    return np.concatenate([
+        seg(xp, full(xp, lo), xp, full(xp, hi)),                # '+' vertical bar
+        seg(xp - 0.2, full(xp, mid), xp + 0.2, full(xp, mid)),  # '+' horizontal bar
+        seg(xc - 0.2, full(xc, lo), xc + 0.2, full(xc, hi)),    # 'x' rising stroke
+        seg(xc + 0.2, full(xc, lo), xc - 0.2, full(xc, hi)),    # 'x' falling stroke
+    ])
+
+def plot_transmission(df, title):
+    try:
+        with _plot_lock:
+            fig, ax = plt.subplots(figsize=(12, 6))
+
+            steps = df['step'].to_numpy()
+            palette = np.array(['blue', 'red'])
+
+            # Plot Alice's bits and bases
+            ax.scatter(steps, np.full(len(df), 0.8), marker='s',
+                      c=palette[df['alice_bits'].to_numpy()],
+                      label='Alice Bits', s=100)
+
+            # Plot Bob's bits and bases
+            ax.scatter(steps, np.full(len(df), 0.2), marker='s',
+                      c=palette[df['bob_bits'].to_numpy()],
+                      label='Bob Bits', s=100)
+
+            # Plot bases as symbols - all glyph strokes go into one collection
+            segments = np.concatenate([
+                _basis_glyph_segments(steps, df['alice_bases'].to_numpy(), 0.8),
+                _basis_glyph_segments(steps, df['bob_bases'].to_numpy(), 0.2),
+            ])
+            ax.add_collection(LineCollection(segments, colors='k', alpha=0.5))
+
+            # Highlight matching bases - one collection instead of a Polygon per qubit
+            matched_steps = steps[df['matched'].to_numpy()]
+            rects = [Rectangle((i - 0.4, 0), 0.8, 1) for i in matched_steps]
+            ax.add_collection(PatchCollection(rects, facecolor='green', alpha=0.1))
+
+            ax.set_ylim(0, 1)
+            ax.set_xlim(-1, len(df))
+            ax.set_yticks([0.2, 0.8])
+            ax.set_yticklabels(['Bob', 'Alice'])
+            ax.set_xlabel('Qubit Number')
+            ax.set_title(title)
+
+            # Add legend
+            legend_elements = [
+                Patch(facecolor='blue', label='Bit 0'),
+                Patch(facecolor='red', label='Bit 1'),
+                Patch(facecolor='green', alpha=0.1, label='Matching Bases')
+            ]
+            ax.legend(handles=legend_elements, loc='upper right')
+
+            plt.tight_layout()
+            return fig
+    except Exception as e:
+        st.error(f"Error creating visualization: {str(e)}")
+        return None
+
+def transmission_chart_frame(df):
+    """Long-format frame for st.scatter_chart: one row per party per qubit"""
+    return pd.DataFrame({
+        'step': np.tile(df['step'].to_numpy(), 2),
+        'who': np.repeat(['Alice', 'Bob'], len(df)),
+        'bit': np.concatenate([df['alice_bits'].to_numpy(), df['bob_bits'].to_numpy()]),
+        'bases_match': np.tile(df['matched'].to_numpy(), 2),
+    })
+
+@st.cache_data(show_spinner=False)
+def run_simulation(num_qubits: int, eavesdropping: bool, seed: int) -> dict:
+    """Run a simulation, cached on its parameters so reruns are free"""
+    simulator = BB84Simulator(num_qubits=num_qubits, eavesdropping=eavesdropping, seed=seed)
+    results = simulator.simulate()
+    return {'results': results, 'viz': simulator.get_visualization_data()}
+
+def main():
+    st.set_page_config(
+        page_title="BB84 Quantum Key Distribution Simulator",
+        page_icon="🔐",
+        layout="wide"
+    )
+    
+    st.title("BB84 Quantum Key Distribution Protocol Simulator")
+    st.write("""
+    This simulator demonstrates the BB84 quantum key distribution protocol, showing how 
+    quantum properties can be used to generate a secure encryption key between two parties.
+    """)
+    
+    # Add explanation
+    with st.expander("How does BB84 work?"):
+        st.write("""
+        1. **Alice** generates random bits and encodes them in random bases (+ or x)
+        2. **Bob** measures the qubits in random bases
+        3. They compare bases and keep only matching ones (sifting)
+        4. They check for errors to detect eavesdropping
+        5. If secure, they use the remaining bits as a key
+        """)
+    
+    # Simulation parameters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        num_qubits = st.slider("Number of Qubits", 10, 2000, 1000)
+    with col2:
+        eavesdropping = st.checkbox("Enable Eavesdropping (Eve)")
+        interactive = st.checkbox("Interactive Chart",
+                                  help="Render with Vega-Lite instead of matplotlib")
+    with col3:
+        seed = st.number_input("Random Seed", min_value=0, value=0,
+                               help="Identical parameters reuse the cached result")
+
+    if st.button("Run Simulation", type="primary"):
+        try:
+            with st.spinner("Running simulation..."):
+                # Run simulation (cached on its parameters)
+                output = run_simulation(num_qubits, eavesdropping, int(seed))
+                results = output['results']
+
+            # Display results
+            st.header("Simulation Results")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Qubits", results['total_qubits'])
+            with col2:
+                st.metric("Sifted Bits", results['sifted_bits'])
+            with col3:
+                st.metric("Error Rate", f"{results['error_rate']:.2%}")
+            
+            # Display security status
+            if results['secure']:
+                st.success("🔒 Key Exchange Successful - Channel appears secure!")
+            else:
+                st.error("⚠️ Warning: High error rate detected! Possible eavesdropping!")
+            
+            # Show visualization
+            st.header("Protocol Visualization")
+            st.write("This visualization shows the first 20 qubits of the transmission:")
+            df = output['viz']
+            if interactive:
+                st.scatter_chart(transmission_chart_frame(df),
+                                 x='step', y='who', color='bit', size='bases_match')
+            else:
+                fig = plot_transmission(df, "BB84 Protocol Transmission Visualization")
+                if fig:
+                    with _plot_lock:
+                        st.pyplot(fig)
+            
+            # Display final key if secure
+            if results['secure'] and results['final_key']:
+                st.header("Final Key")
+                key_display = results['final_key'][:64] + "..." if len(results['final_key']) > 64 else results['final_key']
+                st.code(key_display)
+                st.write(f"Final key length: {results['final_key_length']} bits")
+                
+                # Add key statistics
+                st.subheader("Key Statistics")
+                zeros = results['key_zeros']
+                ones = results['key_ones']
+                key_length = results['final_key_length']
+                st.write(f"Zeros: {zeros} ({zeros/key_length:.1%})")
+                st.write(f"Ones: {ones} ({ones/key_length:.1%})")
+        
+        except Exception as e:
+            st.error(f"Error during simulation: {str(e)}")
+            st.error("Stack trace:")
+            st.code(traceback.format_exc())
+
+if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,12 +1,33 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import streamlit as st
 import pandas as pd
-from typing import List, Tuple, Dict
-import random
+
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# Bases are 0/1 integers everywhere internally (0 = '+' rectilinear,
+# 1 = 'x' diagonal); the symbols exist only for display
+_BASIS_SYMBOLS = np.array(['+', 'x'])
+
+# Below this size the JIT warmup costs more than the kernel saves
+_NUMBA_MIN_QUBITS = 50000
+
+if _HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _transmit_eve(a_bits, a_bases, e_bases, b_bases, r_eve, r_bob):
+        """Fused intercept-resend kernel: Eve's and Bob's measurements in one pass"""
+        eve = np.empty_like(a_bits)
+        bob = np.empty_like(a_bits)
+        for i in prange(a_bits.size):
+            eve_i = a_bits[i] if a_bases[i] == e_bases[i] else r_eve[i]
+            eve[i] = eve_i
+            bob[i] = eve_i if e_bases[i] == b_bases[i] else r_bob[i]
+        return eve, bob
 
 class BB84Simulator:
-    def __init__(self, num_qubits: int = 1000, eavesdropping: bool = False):
+    def __init__(self, num_qubits: int = 1000, eavesdropping: bool = False, seed: int = None):
         # Input validation
         if num_qubits < 10:
             raise ValueError("Number of qubits must be at least 10")
@@ -17,47 +38,36 @@ class BB84Simulator:
 
         self.num_qubits = num_qubits
         self.eavesdropping = eavesdropping
-        self.bases = ['+', 'x']  # Rectilinear and diagonal bases
+        self._rng = np.random.default_rng(seed)
         
         # Initialize data structures
         self.alice_bits = []
         self.alice_bases = []
         self.bob_bases = []
         self.bob_measurements = []
-        self.eve_bases = []
-        self.eve_measurements = []
         self.final_key = []
         self.error_rate = 0.0
         self.sifted_indices = []
-        
-        # History for visualization
-        self.history = {
-            'step': [],
-            'description': [],
-            'alice_bits': [],
-            'alice_bases': [],
-            'bob_bases': [],
-            'bob_bits': [],
-            'matched': []
-        }
-
-    def generate_random_bits(self, size: int) -> List[int]:
-        try:
-            return [random.randint(0, 1) for _ in range(size)]
-        except Exception as e:
-            raise RuntimeError(f"Error generating random bits: {str(e)}")
 
-    def generate_random_bases(self, size: int) -> List[str]:
-        try:
-            return [random.choice(self.bases) for _ in range(size)]
-        except Exception as e:
-            raise RuntimeError(f"Error generating random bases: {str(e)}")
+        # Number of leading qubits to visualize (set by _record_state)
+        self._viz_k = 0
+
+    def generate_random_bits(self, size: int) -> np.ndarray:
+        return self._rng.integers(0, 2, size=size, dtype=np.uint8)
+
+    def generate_random_bases(self, size: int) -> np.ndarray:
+        # Bases are stored as 0/1 integers; use _bases_to_symbols for display
+        return self._rng.integers(0, 2, size=size, dtype=np.uint8)
 
-    def measure_qubit(self, bit: int, send_basis: str, measure_basis: str) -> int:
+    def _bases_to_symbols(self, bases: np.ndarray) -> np.ndarray:
+        """Map 0/1 basis values to their '+'/'x' display symbols"""
+        return _BASIS_SYMBOLS[np.asarray(bases, dtype=np.uint8)]
+
+    def measure_qubit(self, bit: int, send_basis: int, measure_basis: int) -> int:
         # Input validation
         if bit not in [0, 1]:
             raise ValueError("Bit value must be 0 or 1")
-        if send_basis not in self.bases or measure_basis not in self.bases:
+        if send_basis not in [0, 1] or measure_basis not in [0, 1]:
             raise ValueError("Invalid basis")
 
         if send_basis == measure_basis:
@@ -65,7 +75,7 @@ class BB84Simulator:
             return bit
         else:
             # If measuring in the wrong basis, we get a random result
-            return random.randint(0, 1)
+            return int(self._rng.integers(0, 2))
 
     def simulate(self):
         try:
@@ -77,97 +87,115 @@ class BB84Simulator:
             self.bob_bases = self.generate_random_bases(self.num_qubits)
             
             # Step 3: Simulate transmission and measurement
+            # A measurement in the matching basis returns the sent bit;
+            # a mismatched basis returns a fresh random bit.
             if self.eavesdropping:
-                # Eve intercepts and measures
-                self.eve_bases = self.generate_random_bases(self.num_qubits)
-                self.eve_measurements = []
-                eve_resend_bits = []  # The bits Eve will resend to Bob
-                
-                # Eve's measurements and resending
-                for i in range(self.num_qubits):
-                    # Eve measures Alice's qubit
-                    eve_measurement = self.measure_qubit(
-                        self.alice_bits[i],
-                        self.alice_bases[i],
-                        self.eve_bases[i]
-                    )
-                    self.eve_measurements.append(eve_measurement)
-                    
-                    # Eve resends the qubit in her basis
-                    # This is crucial: Eve must resend in HER basis, not Alice's
-                    # This is what causes the errors even when Bob measures in Alice's basis
-                    eve_resend_bits.append(eve_measurement)
-                
-                # Bob measures Eve's forwarded qubits
-                self.bob_measurements = [
-                    self.measure_qubit(eve_bit, eve_basis, bob_basis)
-                    for eve_bit, eve_basis, bob_basis in zip(eve_resend_bits, self.eve_bases, self.bob_bases)
-                ]
+                self.bob_measurements = self._simulate_eve()
             else:
-                # Direct transmission to Bob
-                self.bob_measurements = [
-                    self.measure_qubit(bit, alice_basis, bob_basis)
-                    for bit, alice_basis, bob_basis in zip(self.alice_bits, self.alice_bases, self.bob_bases)
-                ]
-            
+                self.bob_measurements = self._simulate_direct()
+
             # Record state for visualization
             self._record_state()
-            
+
             # Step 4: Sifting - Keep only bits where bases match
-            self.sifted_indices = [
-                i for i in range(self.num_qubits)
-                if self.alice_bases[i] == self.bob_bases[i]
-            ]
-            
-            if not self.sifted_indices:
+            self.sifted_indices = np.flatnonzero(self.alice_bases == self.bob_bases)
+
+            if self.sifted_indices.size == 0:
                 raise RuntimeError("No matching bases found after sifting")
-            
-            self.sifted_key_alice = [self.alice_bits[i] for i in self.sifted_indices]
-            self.sifted_key_bob = [self.bob_measurements[i] for i in self.sifted_indices]
-            
+
             # Step 5: Error detection (using 25% of bits)
-            sample_size = max(1, len(self.sifted_indices) // 4)
-            sample_indices = random.sample(range(len(self.sifted_indices)), sample_size)
-            
-            errors = sum(
-                self.sifted_key_alice[i] != self.sifted_key_bob[i]
-                for i in sample_indices
+            sample_size = max(1, self.sifted_indices.size // 4)
+            # shuffle=False skips an unneeded permutation; order is irrelevant here
+            sample_positions = self._rng.choice(
+                self.sifted_indices, size=sample_size, replace=False, shuffle=False
             )
-            
+
+            errors = self._count_sample_errors(sample_positions)
+
             self.error_rate = errors / sample_size if sample_size > 0 else 1.0
-            
+
             # Remove sampled bits from final key
-            final_key_indices = [i for i in range(len(self.sifted_indices)) if i not in sample_indices]
-            self.final_key = [self.sifted_key_alice[i] for i in final_key_indices]
-            
+            keep = np.setdiff1d(self.sifted_indices, sample_positions, assume_unique=True)
+            self.final_key = self.alice_bits[keep]
+
+            key_ones = int(self.final_key.sum())
             return {
                 'total_qubits': self.num_qubits,
-                'sifted_bits': len(self.sifted_indices),
+                'sifted_bits': self.sifted_indices.size,
                 'error_rate': self.error_rate,
                 'final_key_length': len(self.final_key),
-                'final_key': ''.join(map(str, self.final_key)) if self.error_rate < 0.15 else None,
-                'secure': self.error_rate < 0.15
+                'final_key': bytes(self.final_key + ord('0')).decode() if self.error_rate < 0.15 else None,
+                'secure': self.error_rate < 0.15,
+                'key_ones': key_ones,
+                'key_zeros': len(self.final_key) - key_ones
             }
         except Exception as e:
             raise RuntimeError(f"Error during simulation: {str(e)}")
 
+    def _simulate_direct(self) -> np.ndarray:
+        """Direct Alice-to-Bob transmission: one pass, one random temporary"""
+        rand_bob = self._rng.integers(0, 2, size=self.num_qubits, dtype=np.uint8)
+        return np.where(self.alice_bases == self.bob_bases, self.alice_bits, rand_bob)
+
+    def _simulate_eve(self) -> np.ndarray:
+        """Intercept-resend attack transmission.
+
+        Eve measures in her own random bases and resends in HER basis, not
+        Alice's. This is what causes the errors even when Bob measures in
+        Alice's basis.
+        """
+        self._eve_bases = self.generate_random_bases(self.num_qubits)
+        rand_eve = self._rng.integers(0, 2, size=self.num_qubits, dtype=np.uint8)
+        rand_bob = self._rng.integers(0, 2, size=self.num_qubits, dtype=np.uint8)
+        if _HAS_NUMBA and self.num_qubits > _NUMBA_MIN_QUBITS:
+            # Fused kernel: one parallel pass, no N-sized temporaries
+            self._eve_measurements, bob_measurements = _transmit_eve(
+                self.alice_bits, self.alice_bases, self._eve_bases,
+                self.bob_bases, rand_eve, rand_bob
+            )
+            return bob_measurements
+        self._eve_measurements = np.where(
+            self.alice_bases == self._eve_bases, self.alice_bits, rand_eve
+        )
+        return np.where(
+            self._eve_bases == self.bob_bases, self._eve_measurements, rand_bob
+        )
+
+    @property
+    def eve_bases(self) -> np.ndarray:
+        """Eve's measurement bases; empty unless eavesdropping was simulated"""
+        return getattr(self, '_eve_bases', np.empty(0, dtype=np.uint8))
+
+    @property
+    def eve_measurements(self) -> np.ndarray:
+        """Eve's measurement results; empty unless eavesdropping was simulated"""
+        return getattr(self, '_eve_measurements', np.empty(0, dtype=np.uint8))
+
+    def _count_sample_errors(self, sample_positions: np.ndarray) -> int:
+        """Count Alice/Bob disagreements at the sampled qubit positions.
+
+        The reduction runs on bit-packed buffers: np.packbits stores eight
+        qubits per byte, a single XOR compares them all at once, and
+        np.bitwise_count sums the disagreements without unpacking.
+        """
+        sample_mask = np.zeros(self.num_qubits, dtype=bool)
+        sample_mask[sample_positions] = True
+        packed_diff = np.packbits(self.alice_bits ^ self.bob_measurements)
+        packed_sample = np.packbits(sample_mask)
+        return int(np.bitwise_count(packed_diff & packed_sample).sum())
+
     def _record_state(self):
-        """Record the current state for visualization"""
-        try:
-            for i in range(min(20, self.num_qubits)):  # Record first 20 qubits for visualization
-                self.history['step'].append(i)
-                self.history['description'].append(f'Qubit {i+1}')
-                self.history['alice_bits'].append(self.alice_bits[i])
-                self.history['alice_bases'].append(self.alice_bases[i])
-                self.history['bob_bases'].append(self.bob_bases[i])
-                self.history['bob_bits'].append(self.bob_measurements[i])
-                self.history['matched'].append(self.alice_bases[i] == self.bob_bases[i])
-        except Exception as e:
-            raise RuntimeError(f"Error recording state: {str(e)}")
+        """Mark the first 20 qubits as available for visualization"""
+        self._viz_k = min(20, self.num_qubits)
 
     def get_visualization_data(self) -> pd.DataFrame:
-        """Return the history as a pandas DataFrame for visualization"""
-        try:
-            return pd.DataFrame(self.history)
-        except Exception as e:
-            raise RuntimeError(f"Error creating visualization data: {str(e)}") 
\ No newline at end of file
+        """Build the visualization DataFrame from views of the first qubits"""
+        k = self._viz_k
+        return pd.DataFrame({
+            'step': np.arange(k),
+            'alice_bits': self.alice_bits[:k],
+            'alice_bases': self._bases_to_symbols(self.alice_bases[:k]),
+            'bob_bases': self._bases_to_symbols(self.bob_bases[:k]),
+            'bob_bits': self.bob_measurements[:k],
+            'matched': self.alice_bases[:k] == self.bob_bases[:k]
+        }) 
\ No newline at end of file